@@ -22,6 +22,7 @@ https://creativecommons.org/share-your-work/public-domain/cc0/
 
 # imports
 import datetime
+import time
 from typing import Deque
 
 # project imports
@@ -29,6 +30,51 @@ import config
 import packet
 
 
+# expected message data length(s) per command
+_LENGTHS = {
+	0x11: (15,), # request for address
+	0x13: (4, 64), # get meter info, length is either 64 (ack) or 4 (nack)
+	0x21: (0,), # heartbeat
+	0x22: (26,), # authentication request
+	0x23: (32,), # metering start
+	0x24: (50,), # metering end
+	0x26: (132,), # state update
+	0x31: (2,), # remote start
+	0x32: (2,), # remote stop
+	0x33: (74, 78), # get configuration, not sure why one board sends longer response than the others
+	0x34: (4,), # set configuration
+	0x36: (2,), # unknown
+	0x37: (2,), # unknown
+	0x38: (2,), # unknown
+	0x41: (54,), # unknown
+	0x42: (7,), # set serial number
+	0x43: (18,), # hardware info
+	0x66: (44,), # meter value
+	0x6A: (4,), # charging mode
+	0x6B: (0,), # set current limit
+	0x6C: (2,), # unknown
+}
+
+
+# constant request payloads, assembled once at import instead of per message
+_HEARTBEAT_INTERVAL = "00038400" # 15 min
+_LED_ENABLE = "00"
+_CONNECTION_STATE_DAT = f"{_HEARTBEAT_INTERVAL}{_LED_ENABLE}"
+
+_MASK = "FFFFFFFF"
+_LED_BRIGHTNESS = "1E" # 30%
+_METER_TYPE = "01" # "00" for pulse, "01" for serial
+_AUTO_START = "01"
+_METER_UPDATE_INTERVAL = "00000384" # 15 min
+_REMOTE_START = "00"
+_CONFIGURATION_DAT = f"{_MASK}{_LED_BRIGHTNESS}030000{_METER_TYPE}01000100000000000000{_AUTO_START}000000003C00000384{_METER_UPDATE_INTERVAL}01000000{_REMOTE_START}03E8010000"
+
+_CURRENT_MIN = "003C" # 6.0A
+_CURRENT_FULL = "00A0" # 16.0A
+_CURRENT_LIMIT_STARTING_DAT = f"01{_CURRENT_MIN}{_CURRENT_MIN}{_CURRENT_MIN}{_CURRENT_MIN}"
+_CURRENT_LIMIT_STARTED_DAT = f"01{_CURRENT_MIN}{_CURRENT_FULL}{_CURRENT_FULL}{_CURRENT_FULL}"
+
+
 class CP:
 	"""
 	Manage a single ChargeBox charger module.
@@ -45,6 +91,24 @@ class CP:
 		self._outbox = outbox
 		self._charger_state = 0
 
+		# handlers for commands that need an action, keyed by command
+		self._handlers = {
+			0x11: self._handle_register,
+			0x13: self._handle_response,
+			0x21: self._handle_heartbeat,
+			0x22: self._handle_authentication,
+			0x23: self._handle_metering_start,
+			0x24: self._handle_metering_end,
+			0x26: self._handle_state_update,
+			0x31: self._handle_response,
+			0x32: self._handle_response,
+			0x33: self._handle_response,
+			0x34: self._handle_response,
+			0x66: self._handle_meter_value,
+			0x6A: self._handle_charging_state,
+			0x6B: self._handle_response,
+		}
+
 		# send first request
 		request = packet.Packet()
 		request.dst = packet.ADDR_BROADCAST
@@ -52,7 +116,7 @@ class CP:
 		request.cmd = 0x1E # restart registration
 		request.dat = ""
 		self._last_message = request
-		self._last_message_timestamp = datetime.datetime.now()
+		self._last_message_timestamp = time.monotonic()
 		self._check_message_response = False
 		self._send(request)
 
@@ -64,208 +128,134 @@ class CP:
 
 		# TODO: create proper state machine
 
+		# taken once per message, every _send below reuses it
+		now = time.monotonic()
+
 		if message.dst not in (packet.ADDR_BROADCAST, packet.ADDR_CP):
 			print("message not meant for me")
 			return
 
-		length = len(message.dat)
-
-		if message.cmd == 0x11: # request for address
-			if length != 15:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			serial = message.dat[0:7]
-			response.dat = f"{serial}{packet.ADDR_CHARGER:02X}03" # new address
-			self._send(response)
-			self._charger_state = 1
-
-		elif message.cmd == 0x13: # get meter info
-			if length not in (4, 64): # length is either 64 (ack) or 4 (nack)
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x21: # heartbeat
-			if length != 0:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			response.dat = ""
-			self._send(response)
-
-		elif message.cmd == 0x22: # authentication request
-			if length != 26:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			card_number_length = int.from_bytes(bytes.fromhex(message.dat[2:4]))
-			card_number = message.dat[4:4+card_number_length]
-			status = "12" # access denied
-			if card_number == "000000AS": # auto start
-				status = "01" # access granted
-			elif card_number in config.allowed_cards:
-				status = "01" # access granted
-			response.dat = f"{status}{card_number_length:02X}{card_number:022}FFFF"
-			self._send(response)
-
-		elif message.cmd == 0x23: # metering start
-			if length != 32:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			session = 0
-			response.dat = f"01{session:08X}{self._timestamp()}"
-			self._send(response)
-			# second response is never sent. Does not seem to be a problem.
-
-		elif message.cmd == 0x24: # metering end
-			if length != 50:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			response.dat = "01"
-			self._send(response)
-
-		elif message.cmd == 0x26: # state update
-			if length != 132:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			session = 0
-			response.dat = f"{session:08X}{self._timestamp()}"
-			self._send(response)
-
-		elif message.cmd == 0x31: # remote start
-			if length != 2:
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x32: # remote stop
-			if length != 2:
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x33: # get configuration
-			if length not in (74, 78): # not sure why one board sends longer response than the others
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x34: # set configuration
-			if length != 4:
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x36: # unknown
-			if length != 2:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x37: # unknown
-			if length != 2:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x38: # unknown
-			if length != 2:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x41: # unknown
-			if length != 54:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x42: # set serial number
-			if length != 7:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x43: # hardware info
-			if length != 18:
-				print("invalid message length")
-				return
-
-		elif message.cmd == 0x66: # meter value
-			if length != 44:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			response.dat = ""
-			self._send(response)
-
-		elif message.cmd == 0x6A: # charging mode
-			if length != 4:
-				print("invalid message length")
-				return
-			response = packet.Packet()
-			response.dst = message.src
-			response.src = packet.ADDR_CP
-			response.cmd = message.cmd
-			response.dat = "AA00" # ack
-			self._send(response)
-			state = message.dat[0:2]
-			if state == "A7": # starting
-				request = packet.Packet()
-				request.dst = message.src
-				request.src = packet.ADDR_CP
-				request.cmd = 0x6B # set current limit
-				current_min = "003C" # 6.0A
-				current1 = "003C"
-				current2 = "003C"
-				current3 = "003C"
-				request.dat = f"01{current_min}{current1}{current2}{current3}"
-				self._send(request, True)
-			elif state == "81": # started
-				request = packet.Packet()
-				request.dst = message.src
-				request.src = packet.ADDR_CP
-				request.cmd = 0x6B # set current limit
-				current_min = "003C" # 6.0A
-				current1 = "00A0" # 16.0A
-				current2 = "00A0"
-				current3 = "00A0"
-				request.dat = f"01{current_min}{current1}{current2}{current3}"
-				self._send(request, True)
-
-		elif message.cmd == 0x6B: # charging mode
-			if length != 0:
-				print("invalid message length")
-				return
-			self._disable_response_check()
-
-		elif message.cmd == 0x6C: # unknown
-			if length != 2:
-				print("invalid message length")
-				return
+		if message.cmd not in _LENGTHS:
+			print("unknown message")
+			return
+
+		if len(message.dat) not in _LENGTHS[message.cmd]:
+			print("invalid message length")
+			return
+
+		handler = self._handlers.get(message.cmd)
+		if handler:
+			handler(message, now)
+
+
+	def _reply(self, message, dat, now):
+		"""
+		Queue a response to message with the given data.
+		"""
+
+		response = packet.Packet()
+		response.dst = message.src
+		response.src = packet.ADDR_CP
+		response.cmd = message.cmd
+		response.dat = dat
+		self._send(response, now = now)
+
+
+	def _handle_register(self, message, now):
+		"""
+		Request for address: assign the charger its bus address.
+		"""
+
+		serial = message.dat[0:7]
+		self._reply(message, f"{serial}{packet.ADDR_CHARGER:02X}03", now) # new address
+		self._charger_state = 1
+
+
+	def _handle_heartbeat(self, message, now):
+		"""
+		Heartbeat: acknowledge.
+		"""
+
+		self._reply(message, "", now)
 
+
+	def _handle_authentication(self, message, now):
+		"""
+		Authentication request: check card number against the allowed list.
+		"""
+
+		card_number_length = int.from_bytes(bytes.fromhex(message.dat[2:4]))
+		card_number = message.dat[4:4+card_number_length]
+		status = "12" # access denied
+		if card_number == "000000AS": # auto start
+			status = "01" # access granted
+		elif card_number in config.allowed_cards:
+			status = "01" # access granted
+		self._reply(message, f"{status}{card_number_length:02X}{card_number:022}FFFF", now)
+
+
+	def _handle_metering_start(self, message, now):
+		"""
+		Metering start: acknowledge with session and timestamp.
+		"""
+
+		session = 0
+		self._reply(message, f"01{session:08X}{self._timestamp()}", now)
+		# second response is never sent. Does not seem to be a problem.
+
+
+	def _handle_metering_end(self, message, now):
+		"""
+		Metering end: acknowledge.
+		"""
+
+		self._reply(message, "01", now)
+
+
+	def _handle_state_update(self, message, now):
+		"""
+		State update: acknowledge with session and timestamp.
+		"""
+
+		session = 0
+		self._reply(message, f"{session:08X}{self._timestamp()}", now)
+
+
+	def _handle_meter_value(self, message, now):
+		"""
+		Meter value: acknowledge.
+		"""
+
+		self._reply(message, "", now)
+
+
+	def _handle_charging_state(self, message, now):
+		"""
+		Charging mode: acknowledge, set current limit when a session starts.
+		"""
+
+		self._reply(message, "AA00", now) # ack
+		state = message.dat[0:2]
+		if state == "A7": # starting
+			dat = _CURRENT_LIMIT_STARTING_DAT
+		elif state == "81": # started
+			dat = _CURRENT_LIMIT_STARTED_DAT
 		else:
-			print("unknown message")
+			return
+		request = packet.Packet()
+		request.dst = message.src
+		request.src = packet.ADDR_CP
+		request.cmd = 0x6B # set current limit
+		request.dat = dat
+		self._send(request, True, now)
+
+
+	def _handle_response(self, message, now):
+		"""
+		A response to one of our requests arrived, stop resending it.
+		"""
+
+		self._disable_response_check()
 
 
 	def timers(self):
@@ -273,21 +263,23 @@ class CP:
 		Handle time-sensitive messages
 		"""
 
+		now = time.monotonic()
+
 		if self._check_message_response:
-			self._check_response()
+			self._check_response(now)
 
 		if self._charger_state > 0:
-			self._configure_charger()
+			self._configure_charger(now)
 
 
-	def _check_response(self):
+	def _check_response(self, now):
 		"""
 		See if a response is overdue. If so, resend last message.
 		"""
 
-		if self._last_message_timestamp + datetime.timedelta(seconds = 2) > datetime.datetime.now():
+		if now - self._last_message_timestamp < 2.0:
 			return
-		self._send(self._last_message, True)
+		self._send(self._last_message, True, now)
 
 
 	def _disable_response_check(self):
@@ -298,12 +290,12 @@ class CP:
 		self._check_message_response = False
 
 
-	def _configure_charger(self):
+	def _configure_charger(self, now):
 		"""
 		State machine for proper initialization of charger.
 		"""
 
-		if self._last_message_timestamp + datetime.timedelta(seconds = 5) > datetime.datetime.now():
+		if now - self._last_message_timestamp < 5.0:
 			return
 
 		# poor mans state machine
@@ -312,10 +304,8 @@ class CP:
 			request.dst = packet.ADDR_CHARGER
 			request.src = packet.ADDR_CP
 			request.cmd = 0x1B # connection state changed
-			heartbeat_interval = "00038400" # 15 min
-			led_enable = "00"
-			request.dat = f"{heartbeat_interval}{led_enable}"
-			self._send(request)
+			request.dat = _CONNECTION_STATE_DAT
+			self._send(request, now = now)
 			self._charger_state = 2
 		elif self._charger_state == 2:
 			request = packet.Packet()
@@ -323,21 +313,15 @@ class CP:
 			request.src = packet.ADDR_CP
 			request.cmd = 0x33 # get configuration
 			request.dat = ""
-			self._send(request, True)
+			self._send(request, True, now)
 			self._charger_state = 3
 		elif self._charger_state == 3:
 			request = packet.Packet()
 			request.dst = packet.ADDR_CHARGER
 			request.src = packet.ADDR_CP
 			request.cmd = 0x34 # set configuration
-			mask = "FFFFFFFF"
-			led_brightness = "1E" # 30%
-			meter_type = "01" # "00" for pulse, "01" for serial
-			auto_start = "01"
-			meter_update_interval = "00000384" # 15 min
-			remote_start = "00"
-			request.dat = f"{mask}{led_brightness}030000{meter_type}01000100000000000000{auto_start}000000003C00000384{meter_update_interval}01000000{remote_start}03E8010000"
-			self._send(request, True)
+			request.dat = _CONFIGURATION_DAT
+			self._send(request, True, now)
 			self._charger_state = 4
 		elif self._charger_state == 4:
 			request = packet.Packet()
@@ -345,20 +329,23 @@ class CP:
 			request.src = packet.ADDR_CP
 			request.cmd = 0x13 # get meter info
 			request.dat = ""
-			self._send(request, True)
+			self._send(request, True, now)
 			self._charger_state = 0
 
 
-	def _send(self, p, check_response = False):
+	def _send(self, p, check_response = False, now = None):
 		"""
 		Queue message for sending, handle response check.
 		"""
 
+		if now is None:
+			now = time.monotonic()
 		if check_response:
 			self._check_message_response = True
 			self._last_message = p
-		self._last_message_timestamp = datetime.datetime.now()
-		self._outbox.appendleft(p)
+		self._last_message_timestamp = now
+		# the outbox is a FIFO: append here, popleft in main
+		self._outbox.append(p)
 
 
 	def _timestamp(self):
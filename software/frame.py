@@ -20,151 +20,123 @@ https://creativecommons.org/share-your-work/public-domain/cc0/
 """
 
 
-# project imports
-from packet import Packet
+# imports
+import functools
 
 
-class Frame:
-	"""
-	This class holds data frames.
-	"""
-
-	def __init__(self, data):
-		"""
-		Create Frame from either bytes or Packet.
-		"""
-
-		self._payload = bytes()
-
-		if isinstance(data, bytes):
-			self._from_bytes(data)
-		elif isinstance(data, Packet):
-			self._from_packet(data)
-		else:
-			raise ValueError()
-
+# translation table mapping allowed payload bytes (null, 0-9, A-Z) to 0 and anything else to 1,
+# so the payload can be checked in a single C-level scan
+_ALLOWED = bytes(0 if (b == 0x00 or 0x30 <= b <= 0x39 or 0x41 <= b <= 0x5A) else 1 for b in range(256))
 
-	def _from_bytes(self, data):
-		"""
-		Import Frame from bytes.
-		"""
+# every byte value as two uppercase ASCII hex characters,
+# so encoding a checksum or parity byte is a single table lookup
+_HEX = tuple(f"{b:02X}".encode("ascii") for b in range(256))
 
-		#print(f"frame: {data.hex(' ')}")
-		self._validate(data)
-		self._payload = data[1:-6]
 
+@functools.lru_cache(maxsize = 1024)
+def _calculate_checksum(payload):
+	"""
+	Calculate frame checksum.
+	"""
 
-	def get_bytes(self):
-		"""
-		Return frame as bytes.
-		"""
-
-		# start of frame marker
-		start = b"\x02"
-		data = start
-
-		# payload
-		data += self._payload
-
-		# ckecksum
-		data += self._calculate_checksum(self._payload)
-
-		# parity
-		data += self._calculate_parity(self._payload)
-
-		# end of frame marker
-		end = b"\x03\xFF"
-		data += end
+	checksum = sum(payload) & 0xFF
+	#print(f"calculated checksum: {checksum:02X}")
+	return _HEX[checksum]
 
-		#print(f"frame: {data.hex(' ')}")
-		self._validate(data)
-		return data
 
+@functools.lru_cache(maxsize = 1024)
+def _calculate_parity(payload):
+	"""
+	Calculate frame parity.
+	"""
 
-	def _from_packet(self, p):
-		"""
-		Import Frame payload from Packet.
-		"""
+	# fold the payload as one big integer, XOR-ing halves until a single byte remains,
+	# instead of a per-byte Python loop
+	parity = int.from_bytes(payload, "big")
+	length = len(payload)
+	while length > 1:
+		half = (length + 1) // 2
+		parity = (parity >> (half * 8)) ^ (parity & ((1 << (half * 8)) - 1))
+		length = half
+	#print(f"calculated parity: {parity:02X}")
+	return _HEX[parity]
 
-		self._payload = p.get_payload()
 
-		return self
+@functools.lru_cache(maxsize = 256)
+def encode_frame(payload):
+	"""
+	Build frame as bytes around payload.
+	Cached: most outbound packets (heartbeat replies, acks) repeat the same payload.
+	"""
 
+	# start of frame marker, payload, checksum, parity, end of frame marker,
+	# joined in one go instead of growing the buffer piece by piece
+	data = b"".join((b"\x02", payload, _calculate_checksum(payload), _calculate_parity(payload), b"\x03\xFF"))
 
-	def get_packet(self):
-		"""
-		Return Frame payload as Packet.
-		"""
+	# no validation here: the frame is correct by construction,
+	# validating would just recompute checksum and parity a second time
+	#print(f"frame: {data.hex(' ')}")
+	return data
 
-		return Packet().from_payload(self._payload)
 
+def decode_frame(data):
+	"""
+	Validate frame and return its payload as bytes.
+	"""
 
-	def _calculate_checksum(self, payload):
-		"""
-		Calculate frame checksum.
-		"""
+	#print(f"frame: {data.hex(' ')}")
+	_validate(data)
+	return data[1:-6]
 
-		checksum = sum(payload) % 256
-		checksum_enc = f"{checksum:02X}".encode("ascii")
-		#print(f"calculated checksum: {checksum:02X}")
-		return checksum_enc
 
+def _validate(frame):
+	# raise on the first failed check, so no error string or frame hex dump
+	# is ever built for the common case of a valid frame
 
-	def _calculate_parity(self, payload):
-		"""
-		Calculate frame parity.
-		"""
+	# length
+	length = len(frame)
+	if length < 13:
+		_invalid(f"Invalid frame length: {length}, expected: >= 13", frame)
 
-		parity = 0
-		for payload_byte in payload:
-			parity = parity ^ payload_byte
-		parity_enc = f"{parity:02X}".encode("ascii")
-		#print(f"calculated parity: {parity:02X}")
-		return parity_enc
+	# start of frame marker
+	if frame[0:1] != b"\x02":
+		_invalid(f"Invalid start of frame marker: {frame[0:1]}", frame)
 
+	# end of frame marker
+	if frame[-2:] != b"\x03\xFF":
+		_invalid(f"Invalid end of frame marker: {frame[-2:]}", frame)
 
-	def _validate(self, frame):
+	# payload
+	# the frame markers 0x02 and 0x03 are not in the allowed set,
+	# so one translate scan covers the marker-inside-payload checks as well
+	payload = frame[1:-6]
+	if 1 in payload.translate(_ALLOWED):
+		# only fall back to the slow per-byte scan to report the offending values
 		error = ""
-
-		# length
-		length = len(frame)
-		if length < 13:
-			error += f"Invalid frame length: {length}, expected: >= 13\n"
-
-		# start of frame marker
-		start = frame[0:1]
-		if start != b"\x02":
-			error += f"Invalid start of frame marker: {start}\n"
-
-		# end of frame marker
-		end = frame[-2:]
-		if end != b"\x03\xFF":
-			error += f"Invalid end of frame marker: {end}\n"
-
-		# payload
-		payload = frame[1:-6]
-		if b"\x02" in payload:
-			error += "Start of frame marker inside payload.\n"
-		if b"\x03" in payload:
-			error += "End of frame marker inside payload.\n"
 		for b in payload:
-			#if not (0x30 <= b <= 0x39 or 0x41 <= b <= 0x5A): # 0-9, A-Z
-			if not (b == 0x00 or 0x30 <= b <= 0x39 or 0x41 <= b <= 0x5A): # null, 0-9, A-Z
+			if b == 0x02:
+				error += "Start of frame marker inside payload.\n"
+			elif b == 0x03:
+				error += "End of frame marker inside payload.\n"
+			elif _ALLOWED[b]:
 				error += f"Invalid value in frame payload: {b:02X}.\n"
+		_invalid(error.rstrip("\n"), frame)
+
+	# checksum
+	if frame[-6:-4] != _calculate_checksum(payload):
+		_invalid("Invalid frame checksum.", frame)
 
-		# checksum
-		checksum = frame[-6:-4]
-		if not checksum == self._calculate_checksum(payload):
-			error += "Invalid frame checksum.\n"
+	# parity
+	if frame[-4:-2] != _calculate_parity(payload):
+		_invalid("Invalid frame parity.", frame)
 
-		# parity
-		parity = frame[-4:-2]
-		if not parity == self._calculate_parity(payload):
-			error += "Invalid frame parity.\n"
+	return True
 
-		if error:
-			error += f"Frame: {frame.hex(' ')}"
-			#print(error)
-			raise ValueError(error)
 
-		return True
+def _invalid(error, frame):
+	"""
+	Raise error for invalid frame.
+	"""
+
+	#print(error)
+	raise ValueError(f"{error}\nFrame: {frame.hex(' ')}")
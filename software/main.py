@@ -25,6 +25,8 @@ https://creativecommons.org/share-your-work/public-domain/cc0/
 
 # imports
 import argparse
+import re
+import select
 import time
 from datetime import datetime
 from collections import deque
@@ -45,6 +47,10 @@ MONITOR = False
 OUTBOX: Deque["packet.Packet"] = deque()
 CB_MANAGER = cb_manager.CP(OUTBOX)
 
+# frames are "\x02 payload \x03\xFF" with no frame markers inside the payload,
+# so one compiled pattern finds every complete frame in a single C-level pass
+FRAME_RE = re.compile(rb"\x02[^\x02\x03]*\x03\xFF")
+
 
 def send(p):
 	"""
@@ -53,7 +59,8 @@ def send(p):
 
 	time.sleep(0.1) # bus must be idle for at least 100mS
 	print(f"\033[34msending\033[0m {datetime.now()}")
-	data = frame.Frame(p).get_bytes() # prints packet
+	p.log()
+	data = frame.encode_frame(p.get_payload())
 	HANDLE.write(data)
 	HANDLE.flush()
 	if CAPTURE:
@@ -65,28 +72,19 @@ def send(p):
 def find_frames(data):
 	"""
 	Find any frames in data.
+	Consumed bytes are deleted from the bytearray in place,
+	so no new buffer is allocated per processed frame.
 	"""
 
-	while True:
-		#print(f"data: {data}")
-
-		n = data.find(b"\x02")
-		if n < 0:
-			print(f"start of frame marker not found in data: {data}")
-			return bytes()
-		if n > 0:
-			print(f"data found before start of frame marker: {data[:n]}")
-			data = data[n:]
-
-		m = data.find(b"\x03\xFF")
-		if m < 0:
-			#print("end of frame marker not found in data")
-			return data
-
-		frame_data = data[:m + 2]
+	last_end = 0
+	for match in FRAME_RE.finditer(data):
+		if match.start() > last_end:
+			print(f"data found before start of frame marker: {bytes(data[last_end:match.start()])}")
+		frame_data = bytes(data[match.start():match.end()])
 		#print(f"frame data: {frame_data}")
 		try:
-			p = frame.Frame(frame_data).get_packet() # prints packet
+			p = packet.Packet().from_payload(frame.decode_frame(frame_data))
+			p.log()
 		except ValueError as error:
 			print(f"ERROR: {error}")
 			print(flush = True)
@@ -94,12 +92,20 @@ def find_frames(data):
 			if HANDLE and not MONITOR:
 				CB_MANAGER.respond(p)
 				while OUTBOX:
-					response = OUTBOX.pop()
+					response = OUTBOX.popleft()
 					send(response)
-		finally:
-			data = data[m + 2:]
-		if len(data) == 0:
-			return bytes()
+		last_end = match.end()
+
+	# keep any incomplete frame at the tail for the next read
+	n = data.find(b"\x02", last_end)
+	if n < 0:
+		if len(data) > last_end:
+			print(f"start of frame marker not found in data: {bytes(data[last_end:])}")
+		data.clear()
+	else:
+		if n > last_end:
+			print(f"data found before start of frame marker: {bytes(data[last_end:n])}")
+		del data[:n]
 
 
 def read_from_serial(serial_device):
@@ -107,7 +113,7 @@ def read_from_serial(serial_device):
 	Read data from charger.
 	"""
 
-	data = bytes()
+	data = bytearray()
 
 	global HANDLE
 	HANDLE = serial.rs485.RS485(port = serial_device, baudrate = 38400, timeout = 0)
@@ -115,21 +121,21 @@ def read_from_serial(serial_device):
 	print("Press ^C to stop.")
 
 	while True:
-		if HANDLE.in_waiting:
+		# sleep until data arrives, or until it is time to run the timers again
+		ready, _, _ = select.select([HANDLE.fileno()], [], [], 0.05)
+		new_data = HANDLE.read(4096) if ready else bytes()
+		if new_data:
 			print(f"\033[31mreceived\033[0m {datetime.now()}")
-			# there is data in the serial port buffer
-			new_data = HANDLE.read(HANDLE.in_waiting)
 			if CAPTURE:
 				CAPTURE.write(f"#received {datetime.now()}\n")
 				CAPTURE.write(f"{new_data.hex(' ').upper()}\n")
 				CAPTURE.flush()
 			data += new_data
-			data = find_frames(data)
-		time.sleep(0.01)
+			find_frames(data)
 		if HANDLE and not MONITOR:
 			CB_MANAGER.timers()
 			while OUTBOX:
-				p = OUTBOX.pop()
+				p = OUTBOX.popleft()
 				send(p)
 
 
@@ -139,7 +145,7 @@ def read_from_file(filename):
 	"""
 
 	print(f"Reading captured data from file: {filename}")
-	data = bytes()
+	data = bytearray()
 	with open(filename, mode = "rt", encoding = "ascii") as f:
 		for line in f.readlines():
 			if line[0] == "#":
@@ -149,7 +155,7 @@ def read_from_file(filename):
 				new_data = bytes.fromhex(line)
 				#print(f"read: {new_data.hex(' ').upper()}")
 				data += new_data
-				data = find_frames(data)
+				find_frames(data)
 
 
 def main():
@@ -305,7 +305,8 @@ class CP:
 			self._check_message_response = True
 			self._last_message = p
 		self._last_message_timestamp = datetime.datetime.now()
-		self._outbox.appendleft(p)
+		# the outbox is a FIFO: append here, popleft in main
+		self._outbox.append(p)
 
 
 	def _timestamp(self):
@@ -21,10 +21,14 @@ https://creativecommons.org/share-your-work/public-domain/cc0/
 
 
 # imports
-import re
+import sys
 from datetime import datetime, timedelta
 
 
+# set to False to skip the per-packet console output,
+# packets are still parsed and validated
+VERBOSE = True
+
 # constants
 ADDR_NEW = 0x00 # charger after bootup
 ADDR_CHARGER = 0x01
@@ -32,6 +36,900 @@ ADDR_CP = 0x80
 ADDR_BROADCAST = 0xBC
 ADDR_CHARGESTATION = 0xFD
 
+# address names, resolved with a single dict lookup
+_ADDR_NAMES = {
+	ADDR_NEW: "new",
+	ADDR_CHARGER: "charger",
+	ADDR_CP: "CP",
+	ADDR_BROADCAST: "broadcast",
+	0xA0: "SmartGrid",
+	ADDR_CHARGESTATION: "ChargeStation",
+	0x70: "unknown 70",
+}
+
+
+def _translate_address(address):
+	"""
+	Resolve numeric address to name
+	"""
+
+	return _ADDR_NAMES.get(address, "unknown address")
+
+
+# timestamps on the bus count seconds since this epoch
+_EPOCH = datetime(2000, 1, 1)
+
+
+def _hex_int(s):
+	"""
+	Parse a hex string slice to int.
+	int(s, 16) skips the bytes.fromhex round-trip and its temporary object.
+	"""
+
+	return int(s, 16) if s else 0
+
+
+def _meter_type_name(meter_type):
+	"""
+	Resolve meter type number to name.
+	"""
+
+	if meter_type == 0:
+		return "pulse"
+	if meter_type == 1:
+		return "serial"
+	return "invalid"
+
+
+def _parse_fields(fields, dat):
+	"""
+	Extract and format named fields from dat, driven by a spec table.
+	"""
+
+	return ", ".join(f"{name}: {formatter(_hex_int(dat[start:end]))}" for name, start, end, formatter in fields)
+
+
+# field lists per (command, cmd_type) for the commands that decode as a flat
+# series of fixed-offset fields: (name, start, end, formatter)
+# commands with grouped or variable-length fields keep their own decoders
+_SPEC = {
+	(0x18, "request"): (
+		("update type", 0, 2, str),
+	),
+	(0x32, "request"): (
+		("session", 0, 8, str),
+	),
+	(0x33, "response"): (
+		("led brightness", 36, 38, lambda v: f"{v}%"),
+		("meter update interval", 20, 24, lambda v: f"{v}s"),
+		("meter type", 30, 32, _meter_type_name),
+		("auto start", 54, 56, str),
+		("remote start", 66, 68, str),
+	),
+	(0x34, "request"): (
+		("led brightness", 8, 10, lambda v: f"{v}%"),
+		("meter update interval", 58, 66, lambda v: f"{v}s"),
+		("meter type", 16, 18, _meter_type_name),
+		("auto start", 38, 40, str),
+		("remote start", 74, 76, str),
+	),
+}
+
+
+# state and value names per command, keyed by the raw value
+_STATE_NAMES_1C = {
+	0x00: "disable",
+	0x01: "enable",
+}
+_STATE_NAMES_22 = {
+	0x00: "authentication request",
+	0x01: "access granted",
+	0x03: "not connected to backend",
+	0x12: "access denied",
+	0x1D: "invalid card number",
+}
+#02 (available) -> 47 (charging cable connected) -> 4A (ready) -> 48 (charging) -> 4A (ready) -> 4B (finished) -> 02 (available)
+_STATE_NAMES_26 = {
+	0x02: "available",
+	0x0A: "error",
+	0x47: "charging cable connected",
+	0x48: "charging",
+	0x4A: "ready",
+	0x4B: "finished",
+}
+_LED_COLOUR_NAMES = {
+	0: "off",
+	1: "green",
+	2: "red", # guess
+	3: "yellow",
+	4: "blue",
+	5: "FIXME", # value observed, colour unknown
+}
+_STATE_NAMES_REMOTE = { # shared by remote start (0x31) and remote stop (0x32)
+	0x01: "success",
+	0x23: "failed",
+}
+_STATE_NAMES_6A = {
+	0x07: "unknown 07", # mentioned by Harm Otten
+	0x20: "unknown 20", # observed
+	0x80: "unplugged",
+	0x81: "charging",
+	0xA0: "available",
+	0xA7: "ready",
+	0xC1: "finished",
+	0xE7: "failed",
+}
+
+
+# expected message data length(s) per command, both directions combined,
+# so the quiet path can validate length with one dict lookup instead of
+# running the full decode handler
+# which length belongs to which direction is checked by the handlers
+_EXPECTED_LEN = {
+	0x11: (15, 11), # register
+	0x13: (0, 4, 64), # get meter info
+	0x18: (2,), # request update
+	0x1B: (10,), # connection state changed
+	0x1C: (2,), # led ring enable
+	0x1E: (0,), # restart registration
+	0x21: (0,), # heartbeat
+	0x22: (26, 30), # authentication request
+	0x23: (32, 18), # metering start
+	0x24: (50, 2), # metering end
+	0x26: (132, 16), # state update
+	0x31: (24, 2), # remote start
+	0x32: (8, 2), # remote stop
+	0x33: (0, 74, 78), # get configuration
+	0x34: (86, 4), # set configuration
+	0x42: (7,), # set serial number
+	0x43: (0, 18), # hardware info
+	0x65: (4,), # set meter update interval
+	0x66: (44, 0), # meter value
+	0x6A: (4,), # charging state
+	0x6B: (18, 0), # set current limit
+}
+
+
+def _handle_cmd_11(p, dat_name):
+	"""
+	Decode command 11: register.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "register"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 15:
+			error += f"Invalid message length: {length}, expected: 15\n"
+		serial = p.dat[0:7]
+		firmware_version = p.dat[7:11]
+		hardware_generation = p.dat[13:15]
+		dat_name = f"serial number: {serial}, firmware version: {firmware_version}, hardware generation: {hardware_generation}"
+	else:
+		cmd_type = "response"
+		if length != 11:
+			error += f"Invalid message length: {length}, expected: 11\n"
+		serial = p.dat[0:7]
+		addr = p.dat[7:9]
+		gen = p.dat[9:11]
+		dat_name = f"serial number: {serial}, address: {addr}, gen: {gen}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_13(p, dat_name):
+	"""
+	Decode command 13: get meter info.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "get meter info"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+	else:
+		cmd_type = "response"
+		if length < 4:
+			error += f"Invalid message length: {length}, expected: >= 4\n"
+		state = p.dat[0:4]
+		if state == "AA00":
+			if length != 64:
+				error += f"Invalid message length: {length}, expected: 64\n"
+			version_number_length = _hex_int(p.dat[4:6]) # hardware or firmware version
+			version_number = p.dat[6:6+version_number_length]
+			model_name_length = _hex_int(p.dat[22:24])
+			model_name = p.dat[24:24+model_name_length]
+			serial_number = p.dat[40:56]
+			mains_frequency = _hex_int(p.dat[56:60])/100
+			dat_name = f"version number: {version_number}, model name: {model_name}, serial number: {serial_number}, mains frequency: {mains_frequency}Hz"
+		elif state == "0055":
+			if length != 4:
+				error += f"Invalid message length: {length}, expected: 4\n"
+			dat_name = "meter not found"
+		else:
+			error += f"Invalid state: {state}\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_18(p, dat_name):
+	"""
+	Decode command 18: request update.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "request update"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 2:
+			error += f"Invalid message length: {length}, expected: 2\n"
+		dat_name = _parse_fields(_SPEC[(0x18, "request")], p.dat)
+	else:
+		error += "Invalid message: command 18 does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_1b(p, dat_name):
+	"""
+	Decode command 1B: connection state changed.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "connection state changed"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 10:
+			error += f"Invalid message length: {length}, expected: 10\n"
+		dat_name = ""
+	else:
+		error += "Invalid message: command 1B does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_1c(p, dat_name):
+	"""
+	Decode command 1C: led ring enable.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "led ring enable"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 2:
+			error += f"Invalid message length: {length}, expected: 2\n"
+		state = _hex_int(p.dat[0:2])
+		state_name = _STATE_NAMES_1C.get(state, f"invalid: {state:02X}")
+		dat_name = f"state: {state_name}"
+	else:
+		error += "Invalid message: command 1C does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_1e(p, dat_name):
+	"""
+	Decode command 1E: restart registration.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "restart registration"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+		dat_name = ""
+	else:
+		error += "Invalid message: command 1E does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_21(p, dat_name):
+	"""
+	Decode command 21: heartbeat.
+	Kept flat: heartbeats are the most frequent packet on an idle bus,
+	and both directions decode the same way.
+	"""
+
+	cmd_type = "request" if p.dst == ADDR_CP else "response"
+	if p.dat:
+		return "heartbeat", cmd_type, "", f"Invalid message length: {len(p.dat)}, expected: 0\n"
+	return "heartbeat", cmd_type, "", ""
+
+
+def _handle_cmd_22(p, dat_name):
+	"""
+	Decode command 22: authentication request.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "authentication request"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 26:
+			error += f"Invalid message length: {length}, expected: 26\n"
+	else:
+		cmd_type = "response"
+		if length != 30:
+			error += f"Invalid message length: {length}, expected: 30\n"
+	state = _hex_int(p.dat[0:2])
+	state_name = _STATE_NAMES_22.get(state, f"invalid: {state:02X}")
+	dat_name = f"state: {state_name}"
+	card_number_length = _hex_int(p.dat[2:4])
+	if card_number_length > 0:
+		card_number = p.dat[4:4+card_number_length]
+		if card_number == "000000AS":
+			dat_name += ", auto start"
+		else:
+			dat_name += f", card number: {card_number}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_23(p, dat_name):
+	"""
+	Decode command 23: metering start.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "metering start"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 32:
+			error += f"Invalid message length: {length}, expected: 32\n"
+		card_number_length = _hex_int(p.dat[0:2])
+		card_number = p.dat[2:2+card_number_length]
+		meter_value = _hex_int(p.dat[24:32])/1000
+		dat_name = f"card number: {card_number}, meter value: {meter_value}kWh"
+	else:
+		cmd_type = "response"
+		if length != 18:
+			error += f"Invalid message length: {length}, expected: 18\n"
+		session = _hex_int(p.dat[2:10])
+		timestamp = _hex_int(p.dat[10:18])
+		timestamp_name = f"{_EPOCH + timedelta(seconds=timestamp)}"
+		dat_name = f"session: {session}, timestamp: {timestamp_name}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_24(p, dat_name):
+	"""
+	Decode command 24: metering end.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "metering end"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 50:
+			error += f"Invalid message length: {length}, expected: 50\n"
+		card_number_length = _hex_int(p.dat[0:2])
+		card_number = p.dat[2:2+card_number_length]
+		session = _hex_int(p.dat[32:40])
+		timestamp = _hex_int(p.dat[42:50])
+		timestamp_name = f"{_EPOCH + timedelta(seconds=timestamp)}"
+		meter_value = _hex_int(p.dat[24:32])/1000
+		dat_name = f"card number: {card_number}, meter value: {meter_value}kWh, session: {session}, timestamp: {timestamp_name}"
+	else:
+		cmd_type = "response"
+		if length != 2:
+			error += f"Invalid message length: {length}, expected: 2\n"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_26(p, dat_name):
+	"""
+	Decode command 26: charger state update.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "charger state update"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 132:
+			# bail out before extracting a dozen fields from a truncated message
+			error += f"Invalid message length: {length}, expected: 132\n"
+			return cmd_name, cmd_type, dat_name, error
+		state = _hex_int(p.dat[0:2])
+		led_colour = _hex_int(p.dat[8:10])
+		# offsets 30:32 hold yet another status, not shown
+		# one (name, value) pair per field, joined in a single pass,
+		# instead of one giant f-string
+		fields = (
+			("state", _STATE_NAMES_26.get(state, f"invalid: {state:02X}")),
+			("is charging", _hex_int(p.dat[6:8])),
+			("led colour", _LED_COLOUR_NAMES.get(led_colour, led_colour)),
+			("is locked", _hex_int(p.dat[10:12])),
+			("cable current", f"{_hex_int(p.dat[12:14])}A"),
+			("meter value", f"{_hex_int(p.dat[18:26])/1000}kWh"),
+			("temperature", f"{_hex_int(p.dat[52:56])/10}/{_hex_int(p.dat[92:96])}°C"),
+			("session", _hex_int(p.dat[58:66])),
+			("voltage", f"{_hex_int(p.dat[68:72])}/{_hex_int(p.dat[72:76])}/{_hex_int(p.dat[76:80])}V"),
+			("current", f"{_hex_int(p.dat[80:84])/100}/{_hex_int(p.dat[84:88])/100}/{_hex_int(p.dat[88:92])/100}A"),
+			("power factor", f"{_hex_int(p.dat[96:100])/1000}/{_hex_int(p.dat[100:104])/1000}/{_hex_int(p.dat[104:108])/1000}"),
+			("current limit", f"{_hex_int(p.dat[124:128])/10}A"),
+			("frequency", f"{_hex_int(p.dat[128:132])/100}Hz"),
+		)
+		dat_name = ", ".join(f"{name}: {value}" for name, value in fields)
+	else:
+		cmd_type = "response"
+		if length != 16:
+			error += f"Invalid message length: {length}, expected: 16\n"
+			return cmd_name, cmd_type, dat_name, error
+		session = _hex_int(p.dat[0:8])
+		timestamp = _hex_int(p.dat[8:16])
+		if timestamp == 0:
+			dat_name = "not connected to backend"
+		else:
+			timestamp_name = f"{_EPOCH + timedelta(seconds=timestamp)}"
+			dat_name = f"session: {session}, timestamp: {timestamp_name}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_2a(p, dat_name):
+	"""
+	Decode command 2A: unknown 2A.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 2A"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_31(p, dat_name):
+	"""
+	Decode command 31: remote start.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "remote start"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 24:
+			error += f"Invalid message length: {length}, expected: 24\n"
+		card_number_length = _hex_int(p.dat[0:2])
+		card_number = p.dat[2:2+card_number_length]
+		dat_name = f"card number: {card_number}"
+	else:
+		cmd_type = "response"
+		if length != 2:
+			error += f"Invalid message length: {length}, expected: 2\n"
+		state = _hex_int(p.dat[0:2])
+		state_name = _STATE_NAMES_REMOTE.get(state, f"invalid: {state:02X}")
+		dat_name = f"state: {state_name}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_32(p, dat_name):
+	"""
+	Decode command 32: remote stop.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "remote stop"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 8:
+			error += f"Invalid message length: {length}, expected: 8\n"
+		dat_name = _parse_fields(_SPEC[(0x32, "request")], p.dat)
+	else:
+		cmd_type = "response"
+		if length != 2:
+			error += f"Invalid message length: {length}, expected: 2\n"
+		state = _hex_int(p.dat[0:2])
+		state_name = _STATE_NAMES_REMOTE.get(state, f"invalid: {state:02X}")
+		dat_name = f"state: {state_name}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_33(p, dat_name):
+	"""
+	Decode command 33: get configuration.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "get configuration"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		if length not in (74, 78): # not sure why one board sends longer response than the others
+			error += f"Invalid message length: {length}, expected: 74\n"
+		dat_name = _parse_fields(_SPEC[(0x33, "response")], p.dat)
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_34(p, dat_name):
+	"""
+	Decode command 34: set configuration.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "set configuration"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 86:
+			error += f"Invalid message length: {length}, expected: 86\n"
+		dat_name = _parse_fields(_SPEC[(0x34, "request")], p.dat)
+	else:
+		cmd_type = "response"
+		if length != 4:
+			error += f"Invalid message length: {length}, expected: 4\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_35(p, dat_name):
+	"""
+	Decode command 35: reboot.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "reboot"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		error += "Invalid message: command 35 does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_36(p, dat_name):
+	"""
+	Decode command 36: unknown 36.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 36"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_37(p, dat_name):
+	"""
+	Decode command 37: unknown 37.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 37"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_38(p, dat_name):
+	"""
+	Decode command 38: unknown 38.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 38"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_41(p, dat_name):
+	"""
+	Decode command 41: unknown 41.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 41"
+	cmd_type = "unknown" # both CP and charger can initiate
+	dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_42(p, dat_name):
+	"""
+	Decode command 42: set serial number.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "set serial number"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 7:
+			error += f"Invalid message length: {length}, expected: 7\n"
+		serial = p.dat[0:7]
+		dat_name = f"serial number: {serial}"
+	else:
+		cmd_type = "response"
+		if length != 7:
+			error += f"Invalid message length: {length}, expected: 7\n"
+		serial = p.dat[0:7]
+		dat_name = f"serial number: {serial}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_43(p, dat_name):
+	"""
+	Decode command 43: hardware info.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "hardware info"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		if length != 18:
+			error += f"Invalid message length: {length}, expected: 18\n"
+		hardware_generation = p.dat[0:2]
+		firmware_version = p.dat[2:6]
+		dat_name = f"hardware generation: {hardware_generation}, firmware version: {firmware_version}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_65(p, dat_name):
+	"""
+	Decode command 65: set meter update interval.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "set meter update interval"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 4:
+			error += f"Invalid message length: {length}, expected: 4\n"
+		interval = _hex_int(p.dat[0:4])
+		if interval == 0:
+			dat_name = "interval: off"
+		else:
+			dat_name = f"interval: {interval}s"
+	else:
+		error += "Invalid message: command 65 does not have response\n"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_66(p, dat_name):
+	"""
+	Decode command 66: meter value.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "meter value"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 44:
+			error += f"Invalid message length: {length}, expected: 44\n"
+		voltage1 = _hex_int(p.dat[0:4])
+		voltage2 = _hex_int(p.dat[4:8])
+		voltage3 = _hex_int(p.dat[8:12])
+		current1 = _hex_int(p.dat[12:16])/100
+		current2 = _hex_int(p.dat[16:20])/100
+		current3 = _hex_int(p.dat[20:24])/100
+		power_factor1 = _hex_int(p.dat[24:28])/1000
+		power_factor2 = _hex_int(p.dat[28:32])/1000
+		power_factor3 = _hex_int(p.dat[32:36])/1000
+		meter_value = _hex_int(p.dat[36:44])/1000
+		dat_name = f"voltage: {voltage1}/{voltage2}/{voltage3}V, current: {current1}/{current2}/{current3}A, power factor: {power_factor1}/{power_factor2}/{power_factor3}, meter value: {meter_value}kWh"
+	else:
+		cmd_type = "response"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_6a(p, dat_name):
+	"""
+	Decode command 6A: charging state.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "charging state"
+	if p.dst == ADDR_CP:
+		cmd_type = "request"
+		if length != 4:
+			error += f"Invalid message length: {length}, expected: 4\n"
+		state = _hex_int(p.dat[0:2])
+		state_name = _STATE_NAMES_6A.get(state, f"invalid: {state:02X}")
+		dat_name = f"state: {state_name}"
+	else:
+		cmd_type = "response"
+		if length != 4:
+			error += f"Invalid message length: {length}, expected: 4\n"
+		state = p.dat[0:4]
+		if state == "AA00":
+			state_name = "ack"
+		else:
+			state_name = f"invalid: {state}"
+		dat_name = f"{state_name}"
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_6b(p, dat_name):
+	"""
+	Decode command 6B: set current limit.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "set current limit"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		if length != 18:
+			error += f"Invalid message length: {length}, expected: 18\n"
+		current_min = _hex_int(p.dat[2:6])/10
+		current1 = _hex_int(p.dat[6:10])/10
+		current2 = _hex_int(p.dat[10:14])/10
+		current3 = _hex_int(p.dat[14:18])/10
+		dat_name = f"current min: {current_min}A, current limit: {current1}/{current2}/{current3}A"
+	else:
+		cmd_type = "response"
+		if length != 0:
+			error += f"Invalid message length: {length}, expected: 0\n"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _handle_cmd_6c(p, dat_name):
+	"""
+	Decode command 6C: unknown 6C.
+	"""
+
+	error = ""
+	cmd_type = "unknown"
+	length = len(p.dat)
+	cmd_name = "unknown 6C"
+	if p.src == ADDR_CP:
+		cmd_type = "request"
+		dat_name = ""
+	else:
+		cmd_type = "response"
+		dat_name = ""
+	return cmd_name, cmd_type, dat_name, error
+
+
+def _simple_handler(cmd_name, request_by_src):
+	"""
+	Make a decoder for commands without decoded data fields.
+	The hand-written originals keyed direction on src for some commands
+	and on dst for others; request_by_src preserves that.
+	"""
+
+	def handler(p, dat_name):
+		if request_by_src:
+			cmd_type = "request" if p.src == ADDR_CP else "response"
+		else:
+			cmd_type = "request" if p.dst == ADDR_CP else "response"
+		return cmd_name, cmd_type, "", ""
+	return handler
+
+
+def _chargestation_handler(cmd_name):
+	"""
+	Make a decoder for the uniform 0xFX ChargeStation command family.
+	"""
+
+	def handler(p, dat_name):
+		if p.dst == ADDR_CHARGESTATION:
+			cmd_type = "response"
+		else:
+			cmd_type = "request"
+		return cmd_name, cmd_type, "", ""
+	return handler
+
+
+# command decoders, keyed by command
+_CMD_HANDLERS = {
+	0x11: _handle_cmd_11,
+	0x13: _handle_cmd_13,
+	0x18: _handle_cmd_18,
+	0x1B: _handle_cmd_1b,
+	0x1C: _handle_cmd_1c,
+	0x1E: _handle_cmd_1e,
+	0x21: _handle_cmd_21,
+	0x22: _handle_cmd_22,
+	0x23: _handle_cmd_23,
+	0x24: _handle_cmd_24,
+	0x26: _handle_cmd_26,
+	0x2A: _handle_cmd_2a,
+	0x31: _handle_cmd_31,
+	0x32: _handle_cmd_32,
+	0x33: _handle_cmd_33,
+	0x34: _handle_cmd_34,
+	0x35: _handle_cmd_35,
+	0x36: _handle_cmd_36,
+	0x37: _handle_cmd_37,
+	0x38: _handle_cmd_38,
+	0x41: _handle_cmd_41,
+	0x42: _handle_cmd_42,
+	0x43: _handle_cmd_43,
+	0x65: _handle_cmd_65,
+	0x66: _handle_cmd_66,
+	0x6A: _handle_cmd_6a,
+	0x6B: _handle_cmd_6b,
+	0x6C: _handle_cmd_6c,
+	0xE1: _simple_handler("unknown E1", request_by_src = True),
+	0xE3: _simple_handler("reboot", request_by_src = False),
+	0xE4: _simple_handler("unknown E4", request_by_src = False),
+	0xE6: _simple_handler("unknown E6", request_by_src = True),
+	0xEB: _simple_handler("unknown EB", request_by_src = False),
+	0xEC: _simple_handler("unknown EC", request_by_src = False),
+	0xED: _simple_handler("unknown ED", request_by_src = True),
+}
+
+# 0xF0-0xFB and 0xFD are a uniform family, generated instead of hand-written
+for _cmd in list(range(0xF0, 0xFC)) + [0xFD]:
+	_CMD_HANDLERS[_cmd] = _chargestation_handler(f"unknown {_cmd:02X}")
+_CMD_HANDLERS[0xF6] = _chargestation_handler("reboot")
+_CMD_HANDLERS[0xFD] = _chargestation_handler("reboot")
+
 
 class Packet:
 	"""
@@ -51,16 +949,12 @@ class Packet:
 		No need to validate, that's already handled in the Frame class.
 		"""
 
-		# decode payload
-		data = payload.decode("ascii")
-
-		# set variables
-		self.dst = int.from_bytes(bytes.fromhex(data[0:2]))
-		self.src = int.from_bytes(bytes.fromhex(data[2:4]))
-		self.cmd = int.from_bytes(bytes.fromhex(data[4:6]))
-		self.dat = data[6:]
-
-		self._print()
+		# the header fields parse directly from the payload bytes,
+		# so only the data part needs decoding to str
+		self.dst = _hex_int(payload[0:2])
+		self.src = _hex_int(payload[2:4])
+		self.cmd = _hex_int(payload[4:6])
+		self.dat = payload[6:].decode("ascii")
 
 		return self
 
@@ -79,733 +973,64 @@ class Packet:
 		# encode
 		payload = payload.encode("ascii")
 
-		self._print()
-
 		return payload
 
 
-	def _print(self):
+	def log(self):
 		"""
-		Display Packet data.
+		Display Packet data and validate it, raise ValueError if invalid.
+		Called explicitly, so a decode/re-encode round-trip does not
+		format the same packet twice.
 		"""
 
 		#print(f"raw dat: {self.dat}")
 
-		error = ""
-		dst_name = self._translate_address(self.dst)
-		src_name = self._translate_address(self.src)
-		cmd_type = "unknown"
-		cmd_name = "unknown"
-		dat_name = "unknown"
 		length = len(self.dat)
 
-		foo = int.from_bytes(bytes.fromhex(self.dat[0:4]))
-		if foo == 0xAA00:
+		if not VERBOSE:
+			# quiet path: a single length check against the table,
+			# no field decoding and no string building
+			expected = _EXPECTED_LEN.get(self.cmd)
+			if expected and length not in expected:
+				raise ValueError(f"Invalid message length: {length}, expected: {expected[0]}")
+			return
+
+		dat_name = "unknown"
+		# string compare on the hex slice, no int round-trip,
+		# and no crash when dat does not start with hex (card numbers, serials)
+		head = self.dat[0:4]
+		if head == "AA00":
 			dat_name = "ack"
-		elif foo == 0x0055:
+		elif head == "0055":
 			dat_name = "nack"
 
-		if self.cmd == 0x11:
-			cmd_name = "register"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 15:
-					error += f"Invalid message length: {length}, expected: 15\n"
-				serial = self.dat[0:7]
-				firmware_version = self.dat[7:11]
-				hardware_generation = self.dat[13:15]
-				dat_name = f"serial number: {serial}, firmware version: {firmware_version}, hardware generation: {hardware_generation}"
-			else:
-				cmd_type = "response"
-				if length != 11:
-					error += f"Invalid message length: {length}, expected: 11\n"
-				serial = self.dat[0:7]
-				addr = self.dat[7:9]
-				gen = self.dat[9:11]
-				dat_name = f"serial number: {serial}, address: {addr}, gen: {gen}"
-		elif self.cmd == 0x13:
-			cmd_name = "get meter info"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-			else:
-				cmd_type = "response"
-				if length < 4:
-					error += f"Invalid message length: {length}, expected: >= 4\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:4]))
-				if state == 0xAA00:
-					if length != 64:
-						error += f"Invalid message length: {length}, expected: 64\n"
-					version_number_length = int.from_bytes(bytes.fromhex(self.dat[4:6])) # hardware or firmware version
-					version_number = self.dat[6:6+version_number_length]
-					model_name_length = int.from_bytes(bytes.fromhex(self.dat[22:24]))
-					model_name = self.dat[24:24+model_name_length]
-					serial_number = self.dat[40:56]
-					mains_frequency = int.from_bytes(bytes.fromhex(self.dat[56:60]))/100
-					dat_name = f"version number: {version_number}, model name: {model_name}, serial number: {serial_number}, mains frequency: {mains_frequency}Hz"
-				elif state == 0x0055:
-					if length != 4:
-						error += f"Invalid message length: {length}, expected: 4\n"
-					dat_name = "meter not found"
-				else:
-					error += f"Invalid state: {state:04X}\n"
-		elif self.cmd == 0x18:
-			cmd_name = "request update"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 2:
-					error += f"Invalid message length: {length}, expected: 2\n"
-				update_type = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				dat_name = f"update type: {update_type}"
-			else:
-				error += "Invalid message: command 18 does not have response\n"
-		elif self.cmd == 0x1B:
-			cmd_name = "connection state changed"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 10:
-					error += f"Invalid message length: {length}, expected: 10\n"
-				dat_name = ""
-			else:
-				error += "Invalid message: command 1B does not have response\n"
-		elif self.cmd == 0x1C:
-			cmd_name = "led ring enable"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 2:
-					error += f"Invalid message length: {length}, expected: 2\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				if state == 0x00:
-					state_name = "disable"
-				elif state == 0x01:
-					state_name = "enable"
-				else:
-					state_name = f"invalid: {state:02X}"
-				dat_name = f"state: {state_name}"
-			else:
-				error += "Invalid message: command 1C does not have response\n"
-		elif self.cmd == 0x1E:
-			cmd_name = "restart registration"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-			else:
-				error += "Invalid message: command 1E does not have response\n"
-		elif self.cmd == 0x21:
-			cmd_name = "heartbeat"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-		elif self.cmd == 0x22:
-			cmd_name = "authentication request"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 26:
-					error += f"Invalid message length: {length}, expected: 26\n"
-			else:
-				cmd_type = "response"
-				if length != 30:
-					error += f"Invalid message length: {length}, expected: 30\n"
-			state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-			if state == 0x00:
-				state_name = "authentication request"
-			elif state == 0x01:
-				state_name = "access granted"
-			elif state == 0x03:
-				state_name = "not connected to backend"
-			elif state == 0x12:
-				state_name = "access denied"
-			elif state == 0x1D:
-				state_name = "invalid card number"
-			else:
-				state_name = f"invalid: {state:02X}"
-			dat_name = f"state: {state_name}"
-			card_number_length = int.from_bytes(bytes.fromhex(self.dat[2:4]))
-			if card_number_length > 0:
-				card_number = self.dat[4:4+card_number_length]
-				if card_number == "000000AS":
-					dat_name += ", auto start"
-				else:
-					dat_name += f", card number: {card_number}"
-		elif self.cmd == 0x23:
-			cmd_name = "metering start"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 32:
-					error += f"Invalid message length: {length}, expected: 32\n"
-				card_number_length = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				card_number = self.dat[2:2+card_number_length]
-				meter_value = int.from_bytes(bytes.fromhex(self.dat[24:32]))/1000
-				dat_name = f"card number: {card_number}, meter value: {meter_value}kWh"
-			else:
-				cmd_type = "response"
-				if length != 18:
-					error += f"Invalid message length: {length}, expected: 18\n"
-				session = int.from_bytes(bytes.fromhex(self.dat[2:10]))
-				timestamp = int.from_bytes(bytes.fromhex(self.dat[10:18]))
-				timestamp_name = f"{datetime(year=2000, month=1, day=1) + timedelta(seconds=timestamp)}"
-				dat_name = f"session: {session}, timestamp: {timestamp_name}"
-		elif self.cmd == 0x24:
-			cmd_name = "metering end"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 50:
-					error += f"Invalid message length: {length}, expected: 50\n"
-				card_number_length = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				card_number = self.dat[2:2+card_number_length]
-				session = int.from_bytes(bytes.fromhex(self.dat[32:40]))
-				timestamp = int.from_bytes(bytes.fromhex(self.dat[42:50]))
-				timestamp_name = f"{datetime(year=2000, month=1, day=1) + timedelta(seconds=timestamp)}"
-				meter_value = int.from_bytes(bytes.fromhex(self.dat[24:32]))/1000
-				dat_name = f"card number: {card_number}, meter value: {meter_value}kWh, session: {session}, timestamp: {timestamp_name}"
-			else:
-				cmd_type = "response"
-				if length != 2:
-					error += f"Invalid message length: {length}, expected: 2\n"
-				dat_name = ""
-		elif self.cmd == 0x26:
-			cmd_name = "charger state update"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 132:
-					error += f"Invalid message length: {length}, expected: 132\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				#02 (available) â†’ 47 (charging cable connected) â†’ 4A (ready) â†’ 48 (charging) â†’ 4A (ready) â†’ 4B (finished) â†’ 02 (available)
-				if state == 0x02:
-					state_name = "available"
-				elif state == 0x0A:
-					state_name = "error"
-				elif state == 0x47:
-					state_name = "charging cable connected"
-				elif state == 0x48:
-					state_name = "charging"
-				elif state == 0x4A:
-					state_name = "ready"
-				elif state == 0x4B:
-					state_name = "finished"
-				else:
-					state_name = f"invalid: {state:02X}"
-				#
-				is_charging = int.from_bytes(bytes.fromhex(self.dat[6:8]))
-				led_colour = int.from_bytes(bytes.fromhex(self.dat[8:10]))
-				if led_colour == 0:
-					led_colour_name = "off"
-				elif led_colour == 1:
-					led_colour_name = "green"
-				elif led_colour == 2:
-					led_colour_name = "red" # guess
-				elif led_colour == 3:
-					led_colour_name = "yellow"
-				elif led_colour == 4:
-					led_colour_name = "blue"
-				elif led_colour == 5:
-					led_colour_name = "FIXME" # value observed, colour unknown
-				else:
-					led_colour_name = led_colour
-				is_locked = int.from_bytes(bytes.fromhex(self.dat[10:12]))
-				cable_current = int.from_bytes(bytes.fromhex(self.dat[12:14]))
-				#
-				meter_value = int.from_bytes(bytes.fromhex(self.dat[18:26]))/1000
-				#
-				yet_another_status = int.from_bytes(bytes.fromhex(self.dat[30:32]))
-				#
-				chassis_temperature = int.from_bytes(bytes.fromhex(self.dat[52:56]))/10
-				#
-				session = int.from_bytes(bytes.fromhex(self.dat[58:66]))
-				#
-				voltage1 = int.from_bytes(bytes.fromhex(self.dat[68:72]))
-				voltage2 = int.from_bytes(bytes.fromhex(self.dat[72:76]))
-				voltage3 = int.from_bytes(bytes.fromhex(self.dat[76:80]))
-				current1 = int.from_bytes(bytes.fromhex(self.dat[80:84]))/100
-				current2 = int.from_bytes(bytes.fromhex(self.dat[84:88]))/100
-				current3 = int.from_bytes(bytes.fromhex(self.dat[88:92]))/100
-				socket_temperature = int.from_bytes(bytes.fromhex(self.dat[92:96]))
-				power_factor1 = int.from_bytes(bytes.fromhex(self.dat[96:100]))/1000
-				power_factor2 = int.from_bytes(bytes.fromhex(self.dat[100:104]))/1000
-				power_factor3 = int.from_bytes(bytes.fromhex(self.dat[104:108]))/1000
-				current_limit = int.from_bytes(bytes.fromhex(self.dat[124:128]))/10
-				frequency = int.from_bytes(bytes.fromhex(self.dat[128:132]))/100 # line frequency, mains frequency
-				dat_name = f"state: {state_name}, is charging: {is_charging}, led colour: {led_colour_name}, is locked: {is_locked}, cable current: {cable_current}A, meter value: {meter_value}kWh, temperature: {chassis_temperature}/{socket_temperature}Â°C, session: {session}, voltage: {voltage1}/{voltage2}/{voltage3}V, current: {current1}/{current2}/{current3}A, power factor: {power_factor1}/{power_factor2}/{power_factor3}, current limit: {current_limit}A, frequency: {frequency}Hz"
-			else:
-				cmd_type = "response"
-				if length != 16:
-					error += f"Invalid message length: {length}, expected: 16\n"
-				session = int.from_bytes(bytes.fromhex(self.dat[0:8]))
-				timestamp = int.from_bytes(bytes.fromhex(self.dat[8:16]))
-				if timestamp == 0:
-					dat_name = "not connected to backend"
-				else:
-					timestamp_name = f"{datetime(year=2000, month=1, day=1) + timedelta(seconds=timestamp)}"
-					dat_name = f"session: {session}, timestamp: {timestamp_name}"
-		elif self.cmd == 0x2A:
-			cmd_name = "unknown 2A"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0x31:
-			cmd_name = "remote start"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 24:
-					error += f"Invalid message length: {length}, expected: 24\n"
-				card_number_length = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				card_number = self.dat[2:2+card_number_length]
-				dat_name = f"card number: {card_number}"
-			else:
-				cmd_type = "response"
-				if length != 2:
-					error += f"Invalid message length: {length}, expected: 2\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				if state == 0x01:
-					state_name = "success"
-				elif state == 0x23:
-					state_name = "failed"
-				else:
-					state_name = f"invalid: {state:02X}"
-				dat_name = f"state: {state_name}"
-		elif self.cmd == 0x32:
-			cmd_name = "remote stop"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 8:
-					error += f"Invalid message length: {length}, expected: 8\n"
-				session = int.from_bytes(bytes.fromhex(self.dat[0:8]))
-				dat_name = f"session: {session}"
-			else:
-				cmd_type = "response"
-				if length != 2:
-					error += f"Invalid message length: {length}, expected: 2\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				if state == 0x1:
-					state_name = "success"
-				elif state == 0x23:
-					state_name = "failed"
-				else:
-					state_name = f"invalid: {state:02X}"
-				dat_name = f"state: {state_name}"
-		elif self.cmd == 0x33:
-			cmd_name = "get configuration"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				if length not in (74, 78): # not sure why one board sends longer response than the others
-					error += f"Invalid message length: {length}, expected: 74\n"
-				#
-				meter_update_interval = int.from_bytes(bytes.fromhex(self.dat[20:24]))
-				#
-				meter_type = int.from_bytes(bytes.fromhex(self.dat[30:32]))
-				if meter_type == 0:
-					meter_type_name = "pulse"
-				elif meter_type == 1:
-					meter_type_name = "serial"
-				else:
-					meter_type_name = "invalid"
-				#
-				led_brightness = int.from_bytes(bytes.fromhex(self.dat[36:38]))
-				#
-				auto_start = int.from_bytes(bytes.fromhex(self.dat[54:56]))
-				#
-				remote_start = int.from_bytes(bytes.fromhex(self.dat[66:68]))
-				#
-				dat_name = f"led brightness: {led_brightness}%, meter update interval: {meter_update_interval}s, meter type: {meter_type_name}, auto start: {auto_start}, remote start: {remote_start}"
-		elif self.cmd == 0x34:
-			cmd_name = "set configuration"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 86:
-					error += f"Invalid message length: {length}, expected: 86\n"
-				#
-				led_brightness = int.from_bytes(bytes.fromhex(self.dat[8:10]))
-				#
-				meter_type = int.from_bytes(bytes.fromhex(self.dat[16:18]))
-				if meter_type == 0:
-					meter_type_name = "pulse"
-				elif meter_type == 1:
-					meter_type_name = "serial"
-				else:
-					meter_type_name = "invalid"
-				#
-				auto_start = int.from_bytes(bytes.fromhex(self.dat[38:40]))
-				#
-				meter_update_interval = int.from_bytes(bytes.fromhex(self.dat[58:66]))
-				#
-				remote_start = int.from_bytes(bytes.fromhex(self.dat[74:76]))
-				#
-				dat_name = f"led brightness: {led_brightness}%, meter update interval: {meter_update_interval}s, meter type: {meter_type_name}, auto start: {auto_start}, remote start: {remote_start}"
-			else:
-				cmd_type = "response"
-				if length != 4:
-					error += f"Invalid message length: {length}, expected: 4\n"
-		elif self.cmd == 0x35:
-			cmd_name = "reboot"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				error += "Invalid message: command 35 does not have response\n"
-		elif self.cmd == 0x36:
-			cmd_name = "unknown 36"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0x37:
-			cmd_name = "unknown 37"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0x38:
-			cmd_name = "unknown 38"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0x41:
-			cmd_name = "unknown 41"
-			cmd_type = "unknown" # both CP and charger can initiate
-			dat_name = ""
-		elif self.cmd == 0x42:
-			cmd_name = "set serial number"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 7:
-					error += f"Invalid message length: {length}, expected: 7\n"
-				serial = self.dat[0:7]
-				dat_name = f"serial number: {serial}"
-			else:
-				cmd_type = "response"
-				if length != 7:
-					error += f"Invalid message length: {length}, expected: 7\n"
-				serial = self.dat[0:7]
-				dat_name = f"serial number: {serial}"
-		elif self.cmd == 0x43:
-			cmd_name = "hardware info"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				if length != 18:
-					error += f"Invalid message length: {length}, expected: 18\n"
-				hardware_generation = self.dat[0:2]
-				firmware_version = self.dat[2:6]
-				dat_name = f"hardware generation: {hardware_generation}, firmware version: {firmware_version}"
-		elif self.cmd == 0x65:
-			cmd_name = "set meter update interval"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 4:
-					error += f"Invalid message length: {length}, expected: 4\n"
-				interval = int.from_bytes(bytes.fromhex(self.dat[0:4]))
-				if interval == 0:
-					dst_name = "interval: off"
-				else:
-					dat_name = f"interval: {interval}s"
-			else:
-				error += "Invalid message: command 65 does not have response\n"
-		elif self.cmd == 0x66:
-			cmd_name = "meter value"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 44:
-					error += f"Invalid message length: {length}, expected: 44\n"
-				voltage1 = int.from_bytes(bytes.fromhex(self.dat[0:4]))
-				voltage2 = int.from_bytes(bytes.fromhex(self.dat[4:8]))
-				voltage3 = int.from_bytes(bytes.fromhex(self.dat[8:12]))
-				current1 = int.from_bytes(bytes.fromhex(self.dat[12:16]))/100
-				current2 = int.from_bytes(bytes.fromhex(self.dat[16:20]))/100
-				current3 = int.from_bytes(bytes.fromhex(self.dat[20:24]))/100
-				power_factor1 = int.from_bytes(bytes.fromhex(self.dat[24:28]))/1000
-				power_factor2 = int.from_bytes(bytes.fromhex(self.dat[28:32]))/1000
-				power_factor3 = int.from_bytes(bytes.fromhex(self.dat[32:36]))/1000
-				meter_value = int.from_bytes(bytes.fromhex(self.dat[36:44]))/1000
-				dat_name = f"voltage: {voltage1}/{voltage2}/{voltage3}V, current: {current1}/{current2}/{current3}A, power factor: {power_factor1}/{power_factor2}/{power_factor3}, meter value: {meter_value}kWh"
-			else:
-				cmd_type = "response"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-		elif self.cmd == 0x6A:
-			cmd_name = "charging state"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				if length != 4:
-					error += f"Invalid message length: {length}, expected: 4\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:2]))
-				if state == 0x07:
-					state_name = "unknown 07" # mentioned by Harm Otten
-				elif state == 0x20:
-					state_name = "unknown 20" # observed
-				elif state == 0x80:
-					state_name = "unplugged"
-				elif state == 0x81:
-					state_name = "charging"
-				elif state == 0xA0:
-					state_name = "available"
-				elif state == 0xA7:
-					state_name = "ready"
-				elif state == 0xC1:
-					state_name = "finished"
-				elif state == 0xE7:
-					state_name = "failed"
-				else:
-					state_name = f"invalid: {state:02X}"
-				dat_name = f"state: {state_name}"
-			else:
-				cmd_type = "response"
-				if length != 4:
-					error += f"Invalid message length: {length}, expected: 4\n"
-				state = int.from_bytes(bytes.fromhex(self.dat[0:4]))
-				if state == 0xAA00:
-					state_name = "ack"
-				else:
-					state_name = f"invalid: {state:04X}"
-				dat_name = f"{state_name}"
-		elif self.cmd == 0x6B:
-			cmd_name = "set current limit"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				if length != 18:
-					error += f"Invalid message length: {length}, expected: 18\n"
-				current_min = int.from_bytes(bytes.fromhex(self.dat[2:6]))/10
-				current1 = int.from_bytes(bytes.fromhex(self.dat[6:10]))/10
-				current2 = int.from_bytes(bytes.fromhex(self.dat[10:14]))/10
-				current3 = int.from_bytes(bytes.fromhex(self.dat[14:18]))/10
-				dat_name = f"current min: {current_min}A, current limit: {current1}/{current2}/{current3}A"
-			else:
-				cmd_type = "response"
-				if length != 0:
-					error += f"Invalid message length: {length}, expected: 0\n"
-				dat_name = ""
-		elif self.cmd == 0x6C:
-			cmd_name = "unknown 6C"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xE1:
-			cmd_name = "unknown E1"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xE3:
-			cmd_name = "reboot"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xE4:
-			cmd_name = "unknown E4"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xE6:
-			cmd_name = "unknown E6"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xEB:
-			cmd_name = "unknown EB"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xEC:
-			cmd_name = "unknown EC"
-			if self.dst == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xED:
-			cmd_name = "unknown ED"
-			if self.src == ADDR_CP:
-				cmd_type = "request"
-				dat_name = ""
-			else:
-				cmd_type = "response"
-				dat_name = ""
-		elif self.cmd == 0xF0:
-			cmd_name = "unknown F0"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF1:
-			cmd_name = "unknown F1"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF2:
-			cmd_name = "unknown F2"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF3:
-			cmd_name = "unknown F3"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF4:
-			cmd_name = "unknown F4"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF5:
-			cmd_name = "unknown F5"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF6:
-			cmd_name = "reboot"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF7:
-			cmd_name = "unknown F7"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF8:
-			cmd_name = "unknown F8"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xF9:
-			cmd_name = "unknown F9"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xFA:
-			cmd_name = "unknown FA"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xFB:
-			cmd_name = "unknown FB"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-		elif self.cmd == 0xFD:
-			cmd_name = "reboot"
-			if self.dst == ADDR_CHARGESTATION:
-				cmd_type = "response"
-				dat_name = ""
-			else:
-				cmd_type = "request"
-				dat_name = ""
-
-		dat_fmt = self.dat
-		dat_fmt = re.sub(r"(\w{4})", r"\1 ", dat_fmt).strip() # insert space every 4 characters for readability
-
-		print(f"src: {self.src:02X} ({src_name})")
-		print(f"dst: {self.dst:02X} ({dst_name})")
-		print(f"cmd: {self.cmd:02X} ({cmd_name})")
-		print(f"typ: {cmd_type}")
-		if length > 0:
-			print(f"dat: {dat_fmt} ({dat_name}), length: {length}")
-		print(flush = True)
+		handler = _CMD_HANDLERS.get(self.cmd)
+		if handler:
+			cmd_name, cmd_type, dat_name, error = handler(self, dat_name)
+		else:
+			cmd_name = "unknown"
+			cmd_type = "unknown"
+			error = ""
 
-		if error:
-			raise ValueError(error)
+		dst_name = _translate_address(self.dst)
+		src_name = _translate_address(self.src)
 
+		# insert space every 4 characters for readability
+		dat_fmt = " ".join(self.dat[i:i + 4] for i in range(0, len(self.dat), 4))
 
-	def _translate_address(self, address):
-		"""
-		Resolve numeric address to name
-		"""
+		# one write and one flush for the whole block,
+		# instead of a lock/write/release per print call
+		lines = [
+			f"src: {self.src:02X} ({src_name})",
+			f"dst: {self.dst:02X} ({dst_name})",
+			f"cmd: {self.cmd:02X} ({cmd_name})",
+			f"typ: {cmd_type}",
+		]
+		if length > 0:
+			lines.append(f"dat: {dat_fmt} ({dat_name}), length: {length}")
+		lines.append("\n")
+		sys.stdout.write("\n".join(lines))
+		sys.stdout.flush()
 
-		if address == ADDR_NEW:
-			name = "new"
-		elif address == ADDR_CHARGER:
-			name = "charger"
-		elif address == ADDR_CP:
-			name = "CP"
-		elif address == ADDR_BROADCAST:
-			name = "broadcast"
-		elif address == 0xA0:
-			name = "SmartGrid"
-		elif address == ADDR_CHARGESTATION:
-			name = "ChargeStation"
-		elif address == 0x70:
-			name = "unknown 70"
-		else:
-			name = "unknown address"
-		return name
+		if error:
+			raise ValueError(error)